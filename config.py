@@ -7,6 +7,12 @@ GLOBAL_CONFIG = {
     "buy_time": "2021-01-28 10:00:00.000",
     # 每个账号抢购进程数
     "work_count": 8,
+    # 结算页面与初始化信息(init.action)并发请求
+    "overlap_checkout_init": False,
+    # 提交订单的同时预取下一轮的结算页面与初始化信息
+    "pipeline_next_attempt": False,
+    # 每抢购多少轮输出一次阶段耗时
+    "stage_timing_report_interval": 20,
     # 茅台sku_id
     "sku_id": "100012043978",
     # 账号列表
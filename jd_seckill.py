@@ -8,9 +8,11 @@ import requests
 import random
 import logging
 import logging.handlers
+import threading
 import config
+from contextlib import contextmanager
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 
 # LOG_FILENAME = 'jd_seckill_{}.log'.format(datetime.now().strftime("%Y_%m_%d"))
@@ -110,6 +112,60 @@ class Timer(object):
             else:
                 time.sleep(self.sleep_interval_ms/1000)
 
+class StageTimer(object):
+    """
+    抢购流程各阶段耗时统计
+    """
+    def __init__(self, name):
+        self.name = name
+        self.records = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage_name):
+        """
+        记录一个阶段的耗时(毫秒)，阶段内可能在线程池中并发执行
+        :param stage_name: 阶段名称
+        :return:
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage_name, (time.perf_counter() - begin) * 1000)
+
+    def record(self, stage_name, cost_ms):
+        """
+        累计一次阶段耗时，只保存次数、总耗时、最小、最大耗时
+        :param stage_name: 阶段名称
+        :param cost_ms: 耗时(毫秒)
+        :return:
+        """
+        with self.lock:
+            stat = self.records.get(stage_name)
+            if stat is None:
+                self.records[stage_name] = [1, cost_ms, cost_ms, cost_ms]
+            else:
+                stat[0] += 1
+                stat[1] += cost_ms
+                stat[2] = min(stat[2], cost_ms)
+                stat[3] = max(stat[3], cost_ms)
+
+    def report(self):
+        """
+        输出各阶段的次数、平均、最小、最大耗时
+        :return:
+        """
+        with self.lock:
+            items = [(k, tuple(v)) for k, v in self.records.items()]
+        if not items:
+            return
+        lines = []
+        for stage_name, (count, total, min_cost, max_cost) in items:
+            lines.append('{}: 次数{} 平均{:.1f}ms 最小{:.1f}ms 最大{:.1f}ms'.format(
+                stage_name, count, total / count, min_cost, max_cost))
+        logger.info('[阶段耗时] %s %s', self.name, ' | '.join(lines))
+
 class SpiderSession(object):
     """
     Session相关操作
@@ -395,19 +451,96 @@ class JdSeckill(object):
 
     def seckill(self):
         Timer().start()
-        while True:
-            if config.GLOBAL_CONFIG['debug']:
-                time.sleep(random.randint(1, 5))
-                logger.info(self.account_info['username'] + '测试环境，抢购结束')
-                break
+        if config.GLOBAL_CONFIG['debug']:
+            time.sleep(random.randint(1, 5))
+            logger.info(self.account_info['username'] + '测试环境，抢购结束')
+            return
+        # 结算页面与初始化信息并发请求
+        overlap_checkout_init = config.GLOBAL_CONFIG.get('overlap_checkout_init', False)
+        # 提交订单的同时预取下一轮的结算页面与初始化信息
+        pipeline_next_attempt = config.GLOBAL_CONFIG.get('pipeline_next_attempt', False)
+        # 每抢购多少轮输出一次阶段耗时
+        report_interval = config.GLOBAL_CONFIG.get('stage_timing_report_interval', 20)
+        # 结算页面请求线程，与初始化信息请求并发
+        checkout_pool = ThreadPoolExecutor(1) if overlap_checkout_init else None
+        # 预取下一轮下单参数的线程
+        prefetch_pool = ThreadPoolExecutor(1) if pipeline_next_attempt else None
+        stage_timer = StageTimer(self.account_info['username'])
+        next_order_data_future = None
+        attempt_count = 0
+        try:
+            while True:
+                try:
+                    with stage_timer.stage('获取抢购链接'):
+                        self.request_seckill_url()
+                    while True:
+                        attempt_begin = time.perf_counter()
+                        if next_order_data_future is not None:
+                            # 等待上一轮提交期间预取的下单参数
+                            order_data_future, next_order_data_future = next_order_data_future, None
+                            with stage_timer.stage('等待预取'):
+                                seckill_order_data = order_data_future.result()
+                        else:
+                            seckill_order_data = self.prepare_seckill_order(stage_timer, checkout_pool)
+                        if prefetch_pool is not None:
+                            next_order_data_future = prefetch_pool.submit(
+                                self.prepare_seckill_order, stage_timer, checkout_pool)
+                        if seckill_order_data is not None:
+                            with stage_timer.stage('提交订单'):
+                                self.submit_seckill_order(seckill_order_data)
+                        stage_timer.record('单轮耗时', (time.perf_counter() - attempt_begin) * 1000)
+                        attempt_count += 1
+                        if attempt_count % report_interval == 0:
+                            stage_timer.report()
+                except Exception as e:
+                    logger.info('[非期望内异常] 抢购发生异常，稍后继续执行！错误信息:【{}】'.format(str(e)))
+                    self._drop_prefetch_order_data(next_order_data_future)
+                    next_order_data_future = None
+                wait_some_time(0, 50)
+        finally:
+            stage_timer.report()
+            for pool in (checkout_pool, prefetch_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False)
+
+    def _drop_prefetch_order_data(self, order_data_future):
+        """丢弃预取的下单参数
+        等待预取结束，避免其与重新获取抢购链接的请求同时使用session
+        """
+        if order_data_future is None:
+            return
+        if not order_data_future.cancel():
             try:
-                self.request_seckill_url()
-                while True:
-                    self.request_seckill_checkout_page()
-                    self.submit_seckill_order()
+                order_data_future.result()
             except Exception as e:
-                logger.info('[非期望内异常] 抢购发生异常，稍后继续执行！', e)
-            wait_some_time(0, 50)
+                logger.info('[预取下单参数] 预取发生异常:【{}】'.format(str(e)))
+        logger.info('[预取下单参数] 抢购流程重新开始，丢弃预取结果')
+
+    def prepare_seckill_order(self, stage_timer, pool=None):
+        """访问结算页面并获取提交订单所需参数
+        :param stage_timer: 阶段耗时统计
+        :param pool: 结算页面请求线程池，传入时结算页面与初始化信息并发请求
+        :return: 请求体参数组成的dict，获取失败返回None
+        """
+        checkout_future = None
+        if pool is not None:
+            checkout_future = pool.submit(self._timed_request_seckill_checkout_page, stage_timer)
+        else:
+            self._timed_request_seckill_checkout_page(stage_timer)
+        try:
+            with stage_timer.stage('初始化信息'):
+                seckill_init_info = self._get_seckill_init_info()
+            seckill_order_data = self._get_seckill_order_data(seckill_init_info)
+        except Exception as e:
+            logger.info('[提交抢购] 抢购失败，无法获取生成订单的基本信息，错误信息:【{}】'.format(str(e)))
+            seckill_order_data = None
+        if checkout_future is not None:
+            checkout_future.result()
+        return seckill_order_data
+
+    def _timed_request_seckill_checkout_page(self, stage_timer):
+        with stage_timer.stage('结算页面'):
+            self.request_seckill_checkout_page()
 
     def request_seckill_url(self):
         """获取商品的抢购链接
@@ -488,13 +621,15 @@ class JdSeckill(object):
         resp_json = parse_json(resp.text)
         return resp_json
 
-    def _get_seckill_order_data(self):
+    def _get_seckill_order_data(self, seckill_init_info=None):
         """生成提交抢购订单所需的请求体参数
+        :param seckill_init_info: 已获取的秒杀初始化信息，不传则重新获取
         :return: 请求体参数组成的dict
         """
         logger.info('[抢购参数拼接] 生成提交抢购订单所需参数...')
         # 获取用户秒杀初始化信息
-        seckill_init_info = self._get_seckill_init_info()
+        if seckill_init_info is None:
+            seckill_init_info = self._get_seckill_init_info()
         default_address = seckill_init_info['addressList'][0]  # 默认地址dict
         invoice_info = seckill_init_info.get('invoiceInfo', {})  # 默认发票信息dict, 有可能不返回
         token = seckill_init_info['token']
@@ -536,19 +671,21 @@ class JdSeckill(object):
 
         return data
 
-    def submit_seckill_order(self):
+    def submit_seckill_order(self, seckill_order_data=None):
         """提交抢购（秒杀）订单
+        :param seckill_order_data: 已生成的请求体参数，不传则重新获取
         :return: 抢购结果 True/False
         """
         url = 'https://marathon.jd.com/seckillnew/orderService/pc/submitOrder.action'
         payload = {
             'skuId': self.sku_id,
         }
-        try:
-            seckill_order_data = self._get_seckill_order_data()
-        except Exception as e:
-            logger.info('[提交抢购] 抢购失败，无法获取生成订单的基本信息，错误信息:【{}】'.format(str(e)))
-            return False
+        if seckill_order_data is None:
+            try:
+                seckill_order_data = self._get_seckill_order_data()
+            except Exception as e:
+                logger.info('[提交抢购] 抢购失败，无法获取生成订单的基本信息，错误信息:【{}】'.format(str(e)))
+                return False
 
         logger.info('[提交抢购] 提交抢购订单...')
         headers = {
@@ -0,0 +1,138 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+import config
+import jd_seckill
+
+
+class FakeResponse(object):
+    def __init__(self, text=''):
+        self.text = text
+
+
+class FakeSession(object):
+    """
+    代替requests.Session，按url返回京东接口的模拟数据
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.init_count = 0
+        self.checkout_count = 0
+        self.events = []
+
+    def get(self, url, **kwargs):
+        if 'itemShowBtn' in url:
+            with self.lock:
+                self.events.append('itemShowBtn')
+            return FakeResponse('jQuery1({"url": "//divide.jd.com/user_routing?skuId=1&sn=x&from=pc"})')
+        if 'seckill.action' in url:
+            with self.lock:
+                self.checkout_count += 1
+        return FakeResponse()
+
+    def post(self, url, **kwargs):
+        if 'init.action' in url:
+            with self.lock:
+                self.init_count += 1
+                token = 'token{}'.format(self.init_count)
+                self.events.append(token)
+            address = {
+                'id': 1, 'name': 'n', 'provinceId': 1, 'cityId': 1, 'countyId': 1, 'townId': 1,
+                'addressDetail': 'd', 'mobile': 'm', 'mobileKey': 'k',
+            }
+            return FakeResponse(json.dumps({'addressList': [address], 'token': token}))
+        return FakeResponse(json.dumps({'success': False, 'errorMessage': 'fake'}))
+
+
+class StopSeckill(BaseException):
+    pass
+
+
+class SeckillPipelineTest(unittest.TestCase):
+    submit_times = 4
+
+    def _run_seckill(self, overlap_checkout_init, pipeline_next_attempt, fail_on_submit=None):
+        account_info = dict(config.GLOBAL_CONFIG['account_list'][0], username='pipeline_test')
+        seckill = jd_seckill.JdSeckill(account_info)
+        seckill.session = FakeSession()
+
+        submitted = []
+        submit_seckill_order = seckill.submit_seckill_order
+
+        def fake_submit(seckill_order_data=None):
+            submitted.append(seckill_order_data)
+            if len(submitted) == fail_on_submit:
+                raise RuntimeError('submit failed')
+            submit_seckill_order(seckill_order_data)
+            if len(submitted) >= self.submit_times:
+                raise StopSeckill()
+
+        stage_timers = []
+        stage_timer_cls = jd_seckill.StageTimer
+
+        def make_stage_timer(name):
+            stage_timers.append(stage_timer_cls(name))
+            return stage_timers[-1]
+
+        seckill.submit_seckill_order = fake_submit
+        global_config = {
+            'debug': False,
+            'overlap_checkout_init': overlap_checkout_init,
+            'pipeline_next_attempt': pipeline_next_attempt,
+        }
+        with mock.patch.dict(config.GLOBAL_CONFIG, global_config), \
+                mock.patch.object(jd_seckill, 'Timer'), \
+                mock.patch.object(jd_seckill, 'wait_some_time'), \
+                mock.patch.object(jd_seckill, 'StageTimer', make_stage_timer):
+            with self.assertRaises(StopSeckill):
+                seckill.seckill()
+        return seckill.session, submitted, stage_timers[0].records
+
+    def _assert_tokens(self, submitted):
+        self.assertEqual(
+            [data['token'] for data in submitted],
+            ['token{}'.format(i + 1) for i in range(self.submit_times)])
+
+    def test_serial(self):
+        session, submitted, records = self._run_seckill(False, False)
+        self._assert_tokens(submitted)
+        self.assertEqual(set(records), {'获取抢购链接', '结算页面', '初始化信息', '提交订单', '单轮耗时'})
+        self.assertEqual(records['提交订单'][0], self.submit_times)
+
+    def test_overlap_checkout_init(self):
+        session, submitted, records = self._run_seckill(True, False)
+        self._assert_tokens(submitted)
+        self.assertEqual(set(records), {'获取抢购链接', '结算页面', '初始化信息', '提交订单', '单轮耗时'})
+        self.assertEqual(records['结算页面'][0], self.submit_times)
+
+    def test_pipeline_next_attempt(self):
+        session, submitted, records = self._run_seckill(True, True)
+        # 除第一轮外，提交的都是预取的下单参数
+        self._assert_tokens(submitted)
+        self.assertEqual(
+            set(records), {'获取抢购链接', '结算页面', '初始化信息', '提交订单', '单轮耗时', '等待预取'})
+        self.assertEqual(records['等待预取'][0], self.submit_times - 1)
+
+    def test_pipeline_drops_prefetch_on_error(self):
+        session, submitted, records = self._run_seckill(True, True, fail_on_submit=2)
+        self.assertEqual(records['获取抢购链接'][0], 2)
+        # 第二次提交失败后，预取在重新获取抢购链接之前已结束或被取消，
+        # 重新开始后提交的是新获取的下单参数
+        restart_index = session.events.index('itemShowBtn', 1)
+        self.assertEqual(session.events[restart_index + 1], submitted[2]['token'])
+        self.assertNotIn(submitted[2]['token'], session.events[:restart_index])
+
+
+class StageTimerTest(unittest.TestCase):
+
+    def test_record_keeps_running_aggregates(self):
+        stage_timer = jd_seckill.StageTimer('test')
+        for cost_ms in (3, 1, 2):
+            stage_timer.record('提交订单', cost_ms)
+        self.assertEqual(stage_timer.records['提交订单'], [3, 6, 1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()